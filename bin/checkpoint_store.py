@@ -0,0 +1,122 @@
+# encoding = utf-8
+
+"""
+NetBox Checkpoint Store Module
+Persists processed NetBox object IDs in a per data type SQLite database
+"""
+
+import os
+import sqlite3
+
+
+class Checkpoint:
+    """
+    SQLite-backed set of processed NetBox object IDs
+    """
+
+    def __init__(self, path, legacy_file=None):
+        """
+        Open (or create) checkpoint database
+
+        Args:
+            path (str): Path to SQLite checkpoint database (its directory must exist)
+            legacy_file (str): Line-based checkpoint file to import on first use
+        """
+        self.path = path
+
+        self._conn = sqlite3.connect(path)
+        # WAL with NORMAL sync skips the fsync on every commit; a power loss
+        # can at worst drop the last batches, which are then re-emitted
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen(id INTEGER PRIMARY KEY)")
+
+        # user_version records a finished migration; it is set in the same
+        # transaction as the legacy import so a failed import is retried
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            with self._conn:
+                if legacy_file and os.path.exists(legacy_file):
+                    self._import_legacy(legacy_file)
+                self._conn.execute("PRAGMA user_version = 1")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _import_legacy(self, legacy_file):
+        """
+        Import IDs from a line-based checkpoint file without committing
+
+        Args:
+            legacy_file (str): Path to line-based checkpoint file
+        """
+        with open(legacy_file, 'r') as f:
+            ids = [(int(line),) for line in f.read().splitlines() if line.isdigit()]
+        self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ids)
+
+    def contains_many(self, ids, chunk_size=500):
+        """
+        Get the subset of IDs already present in the checkpoint
+
+        Args:
+            ids (list): Item IDs to check
+            chunk_size (int): Maximum number of IDs per query
+
+        Returns:
+            set: IDs found in the checkpoint
+        """
+        ids = list(ids)
+        found = set()
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._conn.execute(f"SELECT id FROM seen WHERE id IN ({placeholders})", chunk)
+            found.update(row[0] for row in rows)
+        return found
+
+    def add_many(self, ids):
+        """
+        Add item IDs to checkpoint in a single transaction
+
+        Args:
+            ids (list): Item IDs to add
+        """
+        # A NULL id would be assigned a fresh rowid, so skip items without one
+        self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(i,) for i in ids if i is not None])
+        self._conn.commit()
+
+    def missing(self, ids):
+        """
+        Get checkpointed IDs that are not in ids
+
+        Args:
+            ids (iterable): Item IDs seen in a complete run
+
+        Returns:
+            list: Checkpointed IDs absent from ids
+        """
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS live(id INTEGER PRIMARY KEY)")
+        self._conn.executemany("INSERT OR IGNORE INTO live VALUES (?)", [(i,) for i in ids if i is not None])
+        rows = self._conn.execute("SELECT id FROM seen WHERE id NOT IN (SELECT id FROM live)").fetchall()
+        self._conn.execute("DELETE FROM live")
+        self._conn.commit()
+        return [row[0] for row in rows]
+
+    def discard_many(self, ids):
+        """
+        Remove item IDs from checkpoint in a single transaction
+
+        Args:
+            ids (list): Item IDs to remove
+        """
+        self._conn.executemany("DELETE FROM seen WHERE id = ?", [(i,) for i in ids])
+        self._conn.commit()
+
+    def close(self):
+        """
+        Close the database
+        """
+        self._conn.close()
@@ -8,13 +8,70 @@ Handles data collection from NetBox API and sends to Splunk
 import os
 import sys
 import time
-import json
 import csv
+import io
+import functools
+import itertools
+import threading
 from datetime import datetime
+from dataclasses import dataclass
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the current directory to path to import netbox_api
 sys.path.insert(0, os.path.dirname(__file__))
 import netbox_api
+import checkpoint_store
+from netbox_utils import batched, json_dumps as _dumps
+
+# Lookup files live in the app's lookups directory
+_LOOKUPS_DIR = os.path.join(os.environ.get('SPLUNK_HOME', '/opt/splunk'), 'etc', 'apps', 'TA-netbox-connector', 'lookups')
+os.makedirs(_LOOKUPS_DIR, exist_ok=True)
+
+# Checkpoints live next to this module, resolved once so a changed working
+# directory cannot redirect them
+_CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoint')
+
+# Pre-encoded JSON for the common empty tags/custom_fields case
+_EMPTY_ARR = "[]"
+_EMPTY_OBJ = "{}"
+
+# Serializes event writer access when data types are collected concurrently
+_event_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1024)
+def _encode_tags(tag_names):
+    """
+    Encode a tuple of tag names as a JSON list
+
+    Most NetBox objects share a handful of tag sets, so the encoded
+    strings are memoized across rows.
+
+    Args:
+        tag_names: Tuple of tag names
+
+    Returns:
+        str: JSON-encoded list of tag names
+    """
+    return _dumps(list(tag_names))
+
+
+def _sub(item, key, sub_key, default=''):
+    """
+    Get a field of a nested NetBox object
+
+    Args:
+        item: NetBox object
+        key: Key of the nested object
+        sub_key: Key inside the nested object
+        default: Value returned when either level is missing or empty
+
+    Returns:
+        Nested value or default
+    """
+    value = item.get(key)
+    return value.get(sub_key, default) if value else default
 
 
 def validate_input(helper, definition):
@@ -37,19 +94,18 @@ def validate_input(helper, definition):
         raise ValueError("Data type is required")
 
 
-def write_to_splunk(helper, ew, data, source, sourcetype):
+def write_to_splunk(helper, data, source, sourcetype):
     """
     Write event to Splunk
 
     Args:
         helper: Splunk modular input helper
-        ew: Event writer
         data: Data to write (dict or string)
         source: Event source
         sourcetype: Event sourcetype
     """
     if isinstance(data, dict):
-        data_str = json.dumps(data, ensure_ascii=False)
+        data_str = _dumps(data)
     else:
         data_str = str(data)
 
@@ -64,7 +120,7 @@ def write_to_splunk(helper, ew, data, source, sourcetype):
     )
 
     try:
-        ew.write_event(event)
+        helper.write_event(event)
     except Exception as e:
         helper.log_error(f"Failed to write event to Splunk: {str(e)}")
         raise e
@@ -76,57 +132,62 @@ def write_to_lookup(helper, data, lookup_name, fieldnames=None):
 
     Args:
         helper: Splunk modular input helper
-        data: List of dictionaries to write
+        data: Iterable of dictionaries to write, consumed once
         lookup_name: Name of the lookup file
         fieldnames: List of field names (if None, auto-detect from first item)
+
+    Returns:
+        int: Number of records written
     """
     try:
-        # Get the app's lookups directory
-        app_home = os.environ.get('SPLUNK_HOME', '/opt/splunk')
-        lookups_dir = os.path.join(app_home, 'etc', 'apps', 'TA-netbox-connector', 'lookups')
-
-        # Create lookups directory if it doesn't exist
-        os.makedirs(lookups_dir, exist_ok=True)
-
-        lookup_path = os.path.join(lookups_dir, lookup_name)
+        lookup_path = os.path.join(_LOOKUPS_DIR, lookup_name)
 
-        if not data:
+        rows = iter(data)
+        first = next(rows, None)
+        if first is None:
             helper.log_warning(f"No data to write to lookup {lookup_name}")
-            return
+            return 0
 
         # Auto-detect fieldnames if not provided
-        if fieldnames is None and len(data) > 0:
-            fieldnames = list(data[0].keys())
-
-        # Write CSV file
+        if fieldnames is None:
+            fieldnames = list(first.keys())
+
+        # Render CSV in memory row by row, flattening nested objects to JSON strings
+        dumps = _dumps
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writerow = writer.writerow
+        writerow(fieldnames)
+        count = 0
+        for item in itertools.chain((first,), rows):
+            writerow([dumps(value) if isinstance(value, (dict, list)) else value
+                      for value in (item.get(key, '') for key in fieldnames)])
+            count += 1
+
+        # Write CSV file in a single call
         with open(lookup_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for item in data:
-                # Flatten nested objects to JSON strings
-                flattened_item = {}
-                for key, value in item.items():
-                    if isinstance(value, (dict, list)):
-                        flattened_item[key] = json.dumps(value)
-                    else:
-                        flattened_item[key] = value
-                writer.writerow(flattened_item)
-
-        helper.log_info(f"Successfully wrote {len(data)} records to lookup {lookup_name}")
+            csvfile.write(buffer.getvalue())
+
+        helper.log_info(f"Successfully wrote {count} records to lookup {lookup_name}")
+        return count
 
     except Exception as e:
         helper.log_error(f"Failed to write to lookup {lookup_name}: {str(e)}")
         raise e
 
 
-def write_to_kvstore(helper, data, collection_name):
+def write_to_kvstore(helper, data, collection_name, chunk_size=1000):
     """
     Write data to KV Store
 
     Args:
         helper: Splunk modular input helper
-        data: List of dictionaries to write
+        data: Iterable of dictionaries to write, consumed once
         collection_name: Name of the KV Store collection
+        chunk_size: Maximum number of records per batch_save request
+
+    Returns:
+        int: Number of records read from data
     """
     try:
         import splunklib.client as client
@@ -144,51 +205,29 @@ def write_to_kvstore(helper, data, collection_name):
             # Collection will be created via collections.conf
             collection = collections[collection_name]
 
-        # Batch insert data
-        collection.data.batch_save(*data)
+        # Batch insert data in chunks, KV Store caps the size of a single batch
+        saved = 0
+        total = 0
+        for chunk in batched(data, chunk_size):
+            try:
+                collection.data.batch_save(*chunk)
+                saved += len(chunk)
+            except Exception as e:
+                helper.log_error(f"Failed to write records {total}-{total + len(chunk) - 1} to KV Store collection {collection_name}: {str(e)}")
+            total += len(chunk)
 
-        helper.log_info(f"Successfully wrote {len(data)} records to KV Store collection {collection_name}")
+        # Every chunk is attempted, but failed ones must still fail the run
+        if saved < total:
+            raise Exception(f"Only {saved} of {total} records were written")
+
+        helper.log_info(f"Successfully wrote {saved} records to KV Store collection {collection_name}")
+        return total
 
     except Exception as e:
         helper.log_error(f"Failed to write to KV Store collection {collection_name}: {str(e)}")
         raise e
 
 
-def is_checkpoint_exists(checkpoint_file, item_id):
-    """
-    Check if item ID exists in checkpoint file
-
-    Args:
-        checkpoint_file: Path to checkpoint file
-        item_id: Item ID to check
-
-    Returns:
-        bool: True if exists, False otherwise
-    """
-    if not os.path.exists(checkpoint_file):
-        return False
-
-    with open(checkpoint_file, 'r') as f:
-        processed_ids = f.read().splitlines()
-        return str(item_id) in processed_ids
-
-
-def write_to_checkpoint(checkpoint_file, item_id):
-    """
-    Write item ID to checkpoint file
-
-    Args:
-        checkpoint_file: Path to checkpoint file
-        item_id: Item ID to write
-    """
-    # Create checkpoint directory if it doesn't exist
-    checkpoint_dir = os.path.dirname(checkpoint_file)
-    os.makedirs(checkpoint_dir, exist_ok=True)
-
-    with open(checkpoint_file, 'a') as f:
-        f.write(str(item_id) + '\n')
-
-
 def get_checkpoint_timestamp(checkpoint_file):
     """
     Get last modification timestamp from checkpoint file
@@ -204,216 +243,265 @@ def get_checkpoint_timestamp(checkpoint_file):
     return None
 
 
-def collect_devices(helper, client, ew, output_mode, checkpoint_file):
+def project_device(device):
     """
-    Collect devices from NetBox
+    Flatten a NetBox device into a lookup row
 
     Args:
-        helper: Splunk modular input helper
-        client: NetBox API client
-        ew: Event writer
-        output_mode: Output mode (events, lookup, kvstore)
-        checkpoint_file: Checkpoint file path
-    """
-    helper.log_info("Collecting devices from NetBox")
+        device: NetBox device object
 
-    try:
-        devices = client.get_devices()
-        helper.log_info(f"Retrieved {len(devices)} devices from NetBox")
-
-        if output_mode == 'events':
-            # Write each device as separate event
-            for device in devices:
-                device_id = device.get('id')
-                if not is_checkpoint_exists(checkpoint_file, device_id):
-                    write_to_splunk(helper, ew, device, 'netbox:devices', 'netbox:device')
-                    write_to_checkpoint(checkpoint_file, device_id)
-
-        elif output_mode == 'lookup':
-            # Prepare data for lookup
-            lookup_data = []
-            for device in devices:
-                lookup_data.append({
-                    'id': device.get('id'),
-                    'name': device.get('name'),
-                    'device_type': device.get('device_type', {}).get('display') if device.get('device_type') else '',
-                    'device_role': device.get('device_role', {}).get('name') if device.get('device_role') else '',
-                    'site': device.get('site', {}).get('name') if device.get('site') else '',
-                    'rack': device.get('rack', {}).get('name') if device.get('rack') else '',
-                    'status': device.get('status', {}).get('value') if device.get('status') else '',
-                    'primary_ip': device.get('primary_ip', {}).get('address') if device.get('primary_ip') else '',
-                    'serial': device.get('serial', ''),
-                    'asset_tag': device.get('asset_tag', ''),
-                    'last_updated': device.get('last_updated', ''),
-                    'comments': device.get('comments', ''),
-                    'tags': json.dumps([tag.get('name') for tag in device.get('tags', [])]),
-                    'custom_fields': json.dumps(device.get('custom_fields', {}))
-                })
-            write_to_lookup(helper, lookup_data, 'netbox_devices.csv')
-
-        elif output_mode == 'kvstore':
-            write_to_kvstore(helper, devices, 'netbox_devices')
-
-    except Exception as e:
-        helper.log_error(f"Failed to collect devices: {str(e)}")
-        raise e
-
-
-def collect_virtual_machines(helper, client, ew, output_mode, checkpoint_file):
+    Returns:
+        dict: Lookup row
     """
-    Collect virtual machines from NetBox
-
-    Args:
-        helper: Splunk modular input helper
-        client: NetBox API client
-        ew: Event writer
-        output_mode: Output mode (events, lookup, kvstore)
-        checkpoint_file: Checkpoint file path
+    return {
+        'id': device.get('id'),
+        'name': device.get('name'),
+        'device_type': _sub(device, 'device_type', 'display'),
+        'device_role': _sub(device, 'device_role', 'name'),
+        'site': _sub(device, 'site', 'name'),
+        'rack': _sub(device, 'rack', 'name'),
+        'status': _sub(device, 'status', 'value'),
+        'primary_ip': _sub(device, 'primary_ip', 'address'),
+        'serial': device.get('serial', ''),
+        'asset_tag': device.get('asset_tag', ''),
+        'last_updated': device.get('last_updated', ''),
+        'comments': device.get('comments', ''),
+        'tags': _encode_tags(tuple(tag.get('name') for tag in device['tags'])) if device.get('tags') else _EMPTY_ARR,
+        'custom_fields': _dumps(device['custom_fields']) if device.get('custom_fields') else _EMPTY_OBJ
+    }
+
+
+def project_vm(vm):
     """
-    helper.log_info("Collecting virtual machines from NetBox")
-
-    try:
-        vms = client.get_virtual_machines()
-        helper.log_info(f"Retrieved {len(vms)} virtual machines from NetBox")
-
-        if output_mode == 'events':
-            for vm in vms:
-                vm_id = vm.get('id')
-                if not is_checkpoint_exists(checkpoint_file, vm_id):
-                    write_to_splunk(helper, ew, vm, 'netbox:virtual_machines', 'netbox:vm')
-                    write_to_checkpoint(checkpoint_file, vm_id)
-
-        elif output_mode == 'lookup':
-            lookup_data = []
-            for vm in vms:
-                lookup_data.append({
-                    'id': vm.get('id'),
-                    'name': vm.get('name'),
-                    'status': vm.get('status', {}).get('value') if vm.get('status') else '',
-                    'site': vm.get('site', {}).get('name') if vm.get('site') else '',
-                    'cluster': vm.get('cluster', {}).get('name') if vm.get('cluster') else '',
-                    'role': vm.get('role', {}).get('name') if vm.get('role') else '',
-                    'primary_ip': vm.get('primary_ip', {}).get('address') if vm.get('primary_ip') else '',
-                    'vcpus': vm.get('vcpus', ''),
-                    'memory': vm.get('memory', ''),
-                    'disk': vm.get('disk', ''),
-                    'last_updated': vm.get('last_updated', ''),
-                    'comments': vm.get('comments', ''),
-                    'tags': json.dumps([tag.get('name') for tag in vm.get('tags', [])]),
-                    'custom_fields': json.dumps(vm.get('custom_fields', {}))
-                })
-            write_to_lookup(helper, lookup_data, 'netbox_virtual_machines.csv')
-
-        elif output_mode == 'kvstore':
-            write_to_kvstore(helper, vms, 'netbox_virtual_machines')
-
-    except Exception as e:
-        helper.log_error(f"Failed to collect virtual machines: {str(e)}")
-        raise e
+    Flatten a NetBox virtual machine into a lookup row
 
+    Args:
+        vm: NetBox virtual machine object
 
-def collect_ip_addresses(helper, client, ew, output_mode, checkpoint_file):
+    Returns:
+        dict: Lookup row
     """
-    Collect IP addresses from NetBox
-
-    Args:
-        helper: Splunk modular input helper
-        client: NetBox API client
-        ew: Event writer
-        output_mode: Output mode (events, lookup, kvstore)
-        checkpoint_file: Checkpoint file path
+    return {
+        'id': vm.get('id'),
+        'name': vm.get('name'),
+        'status': _sub(vm, 'status', 'value'),
+        'site': _sub(vm, 'site', 'name'),
+        'cluster': _sub(vm, 'cluster', 'name'),
+        'role': _sub(vm, 'role', 'name'),
+        'primary_ip': _sub(vm, 'primary_ip', 'address'),
+        'vcpus': vm.get('vcpus', ''),
+        'memory': vm.get('memory', ''),
+        'disk': vm.get('disk', ''),
+        'last_updated': vm.get('last_updated', ''),
+        'comments': vm.get('comments', ''),
+        'tags': _encode_tags(tuple(tag.get('name') for tag in vm['tags'])) if vm.get('tags') else _EMPTY_ARR,
+        'custom_fields': _dumps(vm['custom_fields']) if vm.get('custom_fields') else _EMPTY_OBJ
+    }
+
+
+def project_ip(ip):
     """
-    helper.log_info("Collecting IP addresses from NetBox")
+    Flatten a NetBox IP address into a lookup row
 
-    try:
-        ip_addresses = client.get_ip_addresses()
-        helper.log_info(f"Retrieved {len(ip_addresses)} IP addresses from NetBox")
-
-        if output_mode == 'events':
-            for ip in ip_addresses:
-                ip_id = ip.get('id')
-                if not is_checkpoint_exists(checkpoint_file, ip_id):
-                    write_to_splunk(helper, ew, ip, 'netbox:ip_addresses', 'netbox:ip')
-                    write_to_checkpoint(checkpoint_file, ip_id)
-
-        elif output_mode == 'lookup':
-            lookup_data = []
-            for ip in ip_addresses:
-                assigned_obj = ip.get('assigned_object', {})
-                lookup_data.append({
-                    'id': ip.get('id'),
-                    'address': ip.get('address'),
-                    'status': ip.get('status', {}).get('value') if ip.get('status') else '',
-                    'dns_name': ip.get('dns_name', ''),
-                    'assigned_object_type': assigned_obj.get('object_type', '') if assigned_obj else '',
-                    'assigned_object': assigned_obj.get('name', '') if assigned_obj else '',
-                    'vrf': ip.get('vrf', {}).get('name') if ip.get('vrf') else '',
-                    'tenant': ip.get('tenant', {}).get('name') if ip.get('tenant') else '',
-                    'description': ip.get('description', ''),
-                    'last_updated': ip.get('last_updated', ''),
-                    'tags': json.dumps([tag.get('name') for tag in ip.get('tags', [])]),
-                    'custom_fields': json.dumps(ip.get('custom_fields', {}))
-                })
-            write_to_lookup(helper, lookup_data, 'netbox_ip_addresses.csv')
-
-        elif output_mode == 'kvstore':
-            write_to_kvstore(helper, ip_addresses, 'netbox_ip_addresses')
+    Args:
+        ip: NetBox IP address object
 
-    except Exception as e:
-        helper.log_error(f"Failed to collect IP addresses: {str(e)}")
-        raise e
+    Returns:
+        dict: Lookup row
+    """
+    return {
+        'id': ip.get('id'),
+        'address': ip.get('address'),
+        'status': _sub(ip, 'status', 'value'),
+        'dns_name': ip.get('dns_name', ''),
+        'assigned_object_type': _sub(ip, 'assigned_object', 'object_type'),
+        'assigned_object': _sub(ip, 'assigned_object', 'name'),
+        'vrf': _sub(ip, 'vrf', 'name'),
+        'tenant': _sub(ip, 'tenant', 'name'),
+        'description': ip.get('description', ''),
+        'last_updated': ip.get('last_updated', ''),
+        'tags': _encode_tags(tuple(tag.get('name') for tag in ip['tags'])) if ip.get('tags') else _EMPTY_ARR,
+        'custom_fields': _dumps(ip['custom_fields']) if ip.get('custom_fields') else _EMPTY_OBJ
+    }
+
+
+def project_site(site):
+    """
+    Flatten a NetBox site into a lookup row
 
+    Args:
+        site: NetBox site object
 
-def collect_sites(helper, client, ew, output_mode, checkpoint_file):
+    Returns:
+        dict: Lookup row
+    """
+    return {
+        'id': site.get('id'),
+        'name': site.get('name'),
+        'slug': site.get('slug'),
+        'status': _sub(site, 'status', 'value'),
+        'region': _sub(site, 'region', 'name'),
+        'facility': site.get('facility', ''),
+        'asn': site.get('asn', ''),
+        'time_zone': site.get('time_zone', ''),
+        'description': site.get('description', ''),
+        'physical_address': site.get('physical_address', ''),
+        'latitude': site.get('latitude', ''),
+        'longitude': site.get('longitude', ''),
+        'tags': _encode_tags(tuple(tag.get('name') for tag in site['tags'])) if site.get('tags') else _EMPTY_ARR,
+        'custom_fields': _dumps(site['custom_fields']) if site.get('custom_fields') else _EMPTY_OBJ
+    }
+
+
+@dataclass(frozen=True)
+class CollectSpec:
     """
-    Collect sites from NetBox
+    Describes how one NetBox data type is collected and written
+
+    Attributes:
+        label: Human readable name used in log messages
+        iterator: Client method yielding objects as pages arrive
+        source: Splunk event source
+        sourcetype: Splunk event sourcetype
+        lookup_file: CSV lookup file name
+        kvstore: KV Store collection name
+        project: Function flattening one object into a lookup row
+        checkpoint_name: Checkpoint file name used when collecting all types
+    """
+    label: str
+    iterator: Callable
+    source: str
+    sourcetype: str
+    lookup_file: str
+    kvstore: str
+    project: Callable
+    checkpoint_name: str
+
+
+SPECS = {
+    'devices': CollectSpec(
+        label='devices',
+        iterator=netbox_api.NetBoxAPIClient.iter_devices,
+        source='netbox:devices',
+        sourcetype='netbox:device',
+        lookup_file='netbox_devices.csv',
+        kvstore='netbox_devices',
+        project=project_device,
+        checkpoint_name='checkpoint_netbox_devices'
+    ),
+    'virtual_machines': CollectSpec(
+        label='virtual machines',
+        iterator=netbox_api.NetBoxAPIClient.iter_virtual_machines,
+        source='netbox:virtual_machines',
+        sourcetype='netbox:vm',
+        lookup_file='netbox_virtual_machines.csv',
+        kvstore='netbox_virtual_machines',
+        project=project_vm,
+        checkpoint_name='checkpoint_netbox_vms'
+    ),
+    'ip_addresses': CollectSpec(
+        label='IP addresses',
+        iterator=netbox_api.NetBoxAPIClient.iter_ip_addresses,
+        source='netbox:ip_addresses',
+        sourcetype='netbox:ip',
+        lookup_file='netbox_ip_addresses.csv',
+        kvstore='netbox_ip_addresses',
+        project=project_ip,
+        checkpoint_name='checkpoint_netbox_ips'
+    ),
+    'sites': CollectSpec(
+        label='sites',
+        iterator=netbox_api.NetBoxAPIClient.iter_sites,
+        source='netbox:sites',
+        sourcetype='netbox:site',
+        lookup_file='netbox_sites.csv',
+        kvstore='netbox_sites',
+        project=project_site,
+        checkpoint_name='checkpoint_netbox_sites'
+    ),
+}
+
+
+def collect_generic(helper, client, output_mode, checkpoint_file, spec):
+    """
+    Collect one data type from NetBox
 
     Args:
         helper: Splunk modular input helper
         client: NetBox API client
-        ew: Event writer
         output_mode: Output mode (events, lookup, kvstore)
         checkpoint_file: Checkpoint file path
+        spec: CollectSpec describing the data type
     """
-    helper.log_info("Collecting sites from NetBox")
+    # Per-item loops below must never log unconditionally; guard any added
+    # logging with a level check so large inventories stay cheap
+    log_info = helper.log_info
+    log_error = helper.log_error
 
-    try:
-        sites = client.get_sites()
-        helper.log_info(f"Retrieved {len(sites)} sites from NetBox")
+    log_info(f"Collecting {spec.label} from NetBox")
 
+    try:
         if output_mode == 'events':
-            for site in sites:
-                site_id = site.get('id')
-                if not is_checkpoint_exists(checkpoint_file, site_id):
-                    write_to_splunk(helper, ew, site, 'netbox:sites', 'netbox:site')
-                    write_to_checkpoint(checkpoint_file, site_id)
-
-        elif output_mode == 'lookup':
-            lookup_data = []
-            for site in sites:
-                lookup_data.append({
-                    'id': site.get('id'),
-                    'name': site.get('name'),
-                    'slug': site.get('slug'),
-                    'status': site.get('status', {}).get('value') if site.get('status') else '',
-                    'region': site.get('region', {}).get('name') if site.get('region') else '',
-                    'facility': site.get('facility', ''),
-                    'asn': site.get('asn', ''),
-                    'time_zone': site.get('time_zone', ''),
-                    'description': site.get('description', ''),
-                    'physical_address': site.get('physical_address', ''),
-                    'latitude': site.get('latitude', ''),
-                    'longitude': site.get('longitude', ''),
-                    'tags': json.dumps([tag.get('name') for tag in site.get('tags', [])]),
-                    'custom_fields': json.dumps(site.get('custom_fields', {}))
-                })
-            write_to_lookup(helper, lookup_data, 'netbox_sites.csv')
+            # Write each object as separate event
+            retrieved = 0
+            live_ids = []
+            with checkpoint_store.Checkpoint(checkpoint_file + '.db', legacy_file=checkpoint_file) as checkpoint:
+                # Events are only written together with their checkpoint commit
+                try:
+                    # Stream objects page by page instead of holding the full list
+                    for batch in batched(spec.iterator(client), 1000):
+                        retrieved += len(batch)
+                        live_ids.extend(item.get('id') for item in batch)
+                        processed_ids = checkpoint.contains_many(item.get('id') for item in batch)
+                        new_ids = []
+                        for item in batch:
+                            item_id = item.get('id')
+                            if item_id not in processed_ids:
+                                write_to_splunk(helper, item, spec.source, spec.sourcetype)
+                                new_ids.append(item_id)
+                                processed_ids.add(item_id)
+
+                        # Only checkpoint IDs whose buffered events reached Splunk
+                        with _event_lock:
+                            helper.flush()
+                        checkpoint.add_many(new_ids)
+                except Exception:
+                    # Buffered events were not checkpointed, drop them so the
+                    # next run does not emit them a second time
+                    helper.discard()
+                    raise
+
+                # NetBox never reuses object IDs, so IDs missing from a complete
+                # run belong to deleted objects and can be dropped; an empty
+                # result is more likely a permission problem and is left alone
+                if live_ids:
+                    missing = checkpoint.missing(live_ids)
+
+                    # Deletions during the run shift page offsets and can make
+                    # a live object look missing, so confirm by ID first
+                    existing = set()
+                    for chunk in batched(missing, 100):
+                        existing.update(item.get('id') for item in spec.iterator(client, {'id': chunk}))
+                    deleted = [item_id for item_id in missing if item_id not in existing]
+
+                    if deleted:
+                        checkpoint.discard_many(deleted)
+                        log_info(f"Pruned {len(deleted)} deleted {spec.label} from checkpoint")
+            log_info(f"Retrieved {retrieved} {spec.label} from NetBox")
+            return
+
+        # Stream pages straight into the writers instead of holding the full list
+        if output_mode == 'lookup':
+            project = spec.project
+            retrieved = write_to_lookup(helper, (project(item) for item in spec.iterator(client)), spec.lookup_file)
+            log_info(f"Retrieved {retrieved} {spec.label} from NetBox")
 
         elif output_mode == 'kvstore':
-            write_to_kvstore(helper, sites, 'netbox_sites')
+            retrieved = write_to_kvstore(helper, spec.iterator(client), spec.kvstore)
+            log_info(f"Retrieved {retrieved} {spec.label} from NetBox")
 
     except Exception as e:
-        helper.log_error(f"Failed to collect sites: {str(e)}")
+        log_error(f"Failed to collect {spec.label}: {str(e)}")
         raise e
 
 
@@ -447,24 +535,23 @@ def collect_events(helper, ew):
         )
 
         # Setup checkpoint file
-        checkpoint_dir = os.path.join(os.path.dirname(__file__), 'checkpoint')
-        checkpoint_file = os.path.join(checkpoint_dir, f'checkpoint_netbox_{data_type}')
+        checkpoint_file = os.path.join(_CHECKPOINT_DIR, f'checkpoint_netbox_{data_type}')
+        os.makedirs(_CHECKPOINT_DIR, exist_ok=True)
 
         # Collect data based on type
-        if data_type == 'devices':
-            collect_devices(helper, client, ew, output_mode, checkpoint_file)
-        elif data_type == 'virtual_machines':
-            collect_virtual_machines(helper, client, ew, output_mode, checkpoint_file)
-        elif data_type == 'ip_addresses':
-            collect_ip_addresses(helper, client, ew, output_mode, checkpoint_file)
-        elif data_type == 'sites':
-            collect_sites(helper, client, ew, output_mode, checkpoint_file)
+        if data_type in SPECS:
+            collect_generic(helper, client, output_mode, checkpoint_file, SPECS[data_type])
         elif data_type == 'all':
-            # Collect all data types
-            collect_devices(helper, client, ew, output_mode, os.path.join(checkpoint_dir, 'checkpoint_netbox_devices'))
-            collect_virtual_machines(helper, client, ew, output_mode, os.path.join(checkpoint_dir, 'checkpoint_netbox_vms'))
-            collect_ip_addresses(helper, client, ew, output_mode, os.path.join(checkpoint_dir, 'checkpoint_netbox_ips'))
-            collect_sites(helper, client, ew, output_mode, os.path.join(checkpoint_dir, 'checkpoint_netbox_sites'))
+            # Collect all data types concurrently, they hit independent endpoints
+            with ThreadPoolExecutor(max_workers=len(SPECS)) as executor:
+                futures = [
+                    executor.submit(collect_generic, helper, client, output_mode,
+                                    os.path.join(_CHECKPOINT_DIR, spec.checkpoint_name), spec)
+                    for spec in SPECS.values()
+                ]
+            # Re-raise the first failure once every collector has finished
+            for future in futures:
+                future.result()
         else:
             raise ValueError(f"Unknown data type: {data_type}")
 
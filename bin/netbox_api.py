@@ -5,10 +5,111 @@ NetBox API Client Module
 Provides functionality to interact with NetBox REST API
 """
 
-import json
+import ipaddress
+import itertools
+import threading
 import requests
-from urllib.parse import urljoin
-import time
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
+from netbox_utils import json_loads as _loads
+
+
+def _is_ip(value):
+    """
+    Check whether a value is an IP address, optionally with a prefix length
+
+    Args:
+        value (str): Hostname or IP address
+
+    Returns:
+        bool: True if value parses as an IP interface
+    """
+    try:
+        ipaddress.ip_interface(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _host_part(address):
+    """
+    Normalize an IP address string to its host part
+
+    Args:
+        address (str): IP address with optional prefix length
+
+    Returns:
+        str: Canonical host address, or the input if it is not a valid IP
+    """
+    host = address.split('/', 1)[0]
+    try:
+        return str(ipaddress.ip_address(host))
+    except ValueError:
+        return host
+
+# Encoded size budget for one multi-value filter, well under the 4094 byte
+# request line that gunicorn (NetBox's usual app server) accepts by default
+_FILTER_BUDGET = 3500
+
+
+def _split_filter(name, values, budget=_FILTER_BUDGET):
+    """
+    Split multi-value filter values into lists whose query string fits a budget
+
+    Args:
+        name (str): Filter parameter name
+        values (list): Filter values
+        budget (int): Maximum encoded size of one list in bytes
+
+    Yields:
+        list: Consecutive lists of values
+    """
+    chunk = []
+    size = 0
+    for value in values:
+        # name=value plus the separating '&', encoded as requests does
+        length = len(name) + len(quote_plus(str(value))) + 2
+        if chunk and size + length > budget:
+            yield chunk
+            chunk = []
+            size = 0
+        chunk.append(value)
+        size += length
+    if chunk:
+        yield chunk
+
+
+def _match_names(objects, names):
+    """
+    Map requested names to the objects a name filter returned
+
+    NetBox may match a name without returning it byte for byte (e.g. in
+    another case), so an exact match is preferred, then one ignoring case.
+
+    Args:
+        objects (list): Objects returned for the name filter
+        names (list): Requested names
+
+    Returns:
+        dict: Object per requested name that was matched
+    """
+    exact = {}
+    folded = {}
+    for obj in objects:
+        name = obj.get('name') or ''
+        exact.setdefault(name, obj)
+        folded.setdefault(name.casefold(), obj)
+
+    matched = {}
+    for name in names:
+        obj = exact.get(name) or folded.get(name.casefold())
+        if obj:
+            matched[name] = obj
+    return matched
 
 
 class NetBoxAPIClient:
@@ -16,7 +117,7 @@ class NetBoxAPIClient:
     Client for interacting with NetBox REST API
     """
 
-    def __init__(self, url, token, verify_ssl=True, timeout=30):
+    def __init__(self, url, token, verify_ssl=True, timeout=30, max_workers=8):
         """
         Initialize NetBox API client
 
@@ -25,12 +126,14 @@ class NetBoxAPIClient:
             token (str): API authentication token
             verify_ssl (bool): Whether to verify SSL certificates
             timeout (int): Request timeout in seconds
+            max_workers (int): Maximum number of pages fetched concurrently
         """
         self.base_url = url.rstrip('/')
-        self.api_url = urljoin(self.base_url, '/api/')
+        self.api_url = self.base_url + '/api/'
         self.token = token
         self.verify_ssl = verify_ssl
         self.timeout = timeout
+        self.max_workers = max_workers
 
         self.headers = {
             'Authorization': f'Token {self.token}',
@@ -38,6 +141,29 @@ class NetBoxAPIClient:
             'Accept': 'application/json'
         }
 
+        # Shared session keeps connections alive across requests and page threads
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        # Advertise every encoding urllib3 can decode here (gzip/deflate,
+        # plus br/zstd when their optional modules are installed)
+        self._session.headers['Accept-Encoding'] = make_headers(accept_encoding=True)['accept-encoding']
+        # requests skips certificate checks for verify=None, so an unset
+        # setting must fall back to the verifying default
+        self._session.verify = True if self.verify_ssl is None else self.verify_ssl
+        # A client only talks to one NetBox host, so a single host pool is
+        # enough. Several page iterators may share the client (e.g. the 'all'
+        # data type), so in-flight requests are capped at the pool size rather
+        # than letting urllib3 open and discard connections beyond it.
+        pool_size = max(16, self.max_workers)
+        self._request_slots = threading.BoundedSemaphore(pool_size)
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        )
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
     def _make_request(self, endpoint, params=None, method='GET'):
         """
         Make HTTP request to NetBox API
@@ -50,57 +176,97 @@ class NetBoxAPIClient:
         Returns:
             dict: Response data
         """
-        url = urljoin(self.api_url, endpoint)
+        url = self.api_url + endpoint.lstrip('/')
 
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                params=params,
-                verify=self.verify_ssl,
-                timeout=self.timeout
-            )
+            with self._request_slots:
+                response = self._session.request(
+                    method=method,
+                    url=url,
+                    params=params,
+                    timeout=self.timeout
+                )
             response.raise_for_status()
-            return response.json()
+            return _loads(response.content)
         except requests.exceptions.RequestException as e:
             raise Exception(f"NetBox API request failed: {str(e)}")
+        except ValueError as e:
+            raise Exception(f"NetBox API returned invalid JSON: {str(e)}")
 
-    def _get_all_pages(self, endpoint, params=None, limit=1000):
+    def _iter_all_pages(self, endpoint, params=None, limit=0):
         """
-        Get all pages of results from paginated API endpoint
+        Iterate over all results of paginated API endpoint as pages arrive
 
         Args:
             endpoint (str): API endpoint
             params (dict): Query parameters
-            limit (int): Results per page
+            limit (int): Results per page (0 lets NetBox use its MAX_PAGE_SIZE)
 
-        Returns:
-            list: All results from all pages
+        Yields:
+            dict: Result objects in API order
         """
-        if params is None:
-            params = {}
-
+        params = dict(params or {})
         params['limit'] = limit
-        params['offset'] = 0
 
-        all_results = []
+        # First page tells us the total count and the page size the server honours
+        response = self._make_request(endpoint, params={**params, 'offset': 0})
+        first_results = response.get('results', [])
+        yield from first_results
+
+        if not response.get('next') or not first_results:
+            return
+
+        page_size = len(first_results)
+        offsets = range(page_size, response.get('count', 0), page_size)
+
+        def fetch_page(offset):
+            page = self._make_request(endpoint, params={**params, 'limit': page_size, 'offset': offset})
+            return page.get('results', [])
+
+        # Keep max_workers page requests in flight, topping the queue up as
+        # each page is handed out, so downloads overlap with the consumer's
+        # writes while at most max_workers pages are held in memory
+        offsets = iter(offsets)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque(executor.submit(fetch_page, offset)
+                            for offset in itertools.islice(offsets, self.max_workers))
+            while pending:
+                results = pending.popleft().result()
+                for offset in itertools.islice(offsets, 1):
+                    pending.append(executor.submit(fetch_page, offset))
+                yield from results
+
+    def _iter_filtered(self, endpoint, name, values):
+        """
+        Iterate over objects matching any of many filter values
 
-        while True:
-            response = self._make_request(endpoint, params=params)
-            results = response.get('results', [])
-            all_results.extend(results)
+        The values are split over as many requests as needed to keep each
+        URL within the server's request line limit.
+
+        Args:
+            endpoint (str): API endpoint
+            name (str): Filter parameter name (e.g., 'name')
+            values (list): Filter values
 
-            # Check if there are more pages
-            if not response.get('next'):
-                break
+        Yields:
+            dict: Matching objects
+        """
+        for chunk in _split_filter(name, values):
+            yield from self._iter_all_pages(endpoint, params={name: chunk})
 
-            params['offset'] += limit
+    def _get_all_pages(self, endpoint, params=None, limit=0):
+        """
+        Get all pages of results from paginated API endpoint
 
-            # Small delay to avoid overwhelming the API
-            time.sleep(0.1)
+        Args:
+            endpoint (str): API endpoint
+            params (dict): Query parameters
+            limit (int): Results per page (0 lets NetBox use its MAX_PAGE_SIZE)
 
-        return all_results
+        Returns:
+            list: All results from all pages
+        """
+        return list(self._iter_all_pages(endpoint, params=params, limit=limit))
 
     def get_devices(self, limit=None, filters=None):
         """
@@ -122,6 +288,18 @@ class NetBoxAPIClient:
         else:
             return self._get_all_pages(endpoint, params=params)
 
+    def iter_devices(self, filters=None):
+        """
+        Iterate over all devices in NetBox without materializing the full list
+
+        Args:
+            filters (dict): Additional filters
+
+        Yields:
+            dict: Device objects
+        """
+        return self._iter_all_pages('dcim/devices/', params=filters)
+
     def get_device_by_name(self, name):
         """
         Get device by name
@@ -171,6 +349,18 @@ class NetBoxAPIClient:
         else:
             return self._get_all_pages(endpoint, params=params)
 
+    def iter_virtual_machines(self, filters=None):
+        """
+        Iterate over all virtual machines in NetBox without materializing the full list
+
+        Args:
+            filters (dict): Additional filters
+
+        Yields:
+            dict: Virtual machine objects
+        """
+        return self._iter_all_pages('virtualization/virtual-machines/', params=filters)
+
     def get_vm_by_name(self, name):
         """
         Get virtual machine by name
@@ -207,6 +397,18 @@ class NetBoxAPIClient:
         else:
             return self._get_all_pages(endpoint, params=params)
 
+    def iter_ip_addresses(self, filters=None):
+        """
+        Iterate over all IP addresses in NetBox without materializing the full list
+
+        Args:
+            filters (dict): Additional filters
+
+        Yields:
+            dict: IP address objects
+        """
+        return self._iter_all_pages('ipam/ip-addresses/', params=filters)
+
     def get_ip_address_by_address(self, address):
         """
         Get IP address by address string
@@ -257,6 +459,18 @@ class NetBoxAPIClient:
         else:
             return self._get_all_pages(endpoint, params=params)
 
+    def iter_sites(self, filters=None):
+        """
+        Iterate over all sites in NetBox without materializing the full list
+
+        Args:
+            filters (dict): Additional filters
+
+        Yields:
+            dict: Site objects
+        """
+        return self._iter_all_pages('dcim/sites/', params=filters)
+
     def get_racks(self, limit=None, filters=None):
         """
         Get all racks from NetBox
@@ -315,35 +529,103 @@ class NetBoxAPIClient:
         Returns:
             dict: Enriched host data or None
         """
-        # First try as hostname
-        host = self.search_host(hostname_or_ip)
-        if host:
-            return host
-
-        # Try as IP address
-        ip_info = self.get_ip_address_by_address(hostname_or_ip)
-        if ip_info:
-            result = {
-                'type': 'ip_address',
-                'data': ip_info
-            }
+        # Only IP values can match an IP address, so try those as one first
+        if _is_ip(hostname_or_ip):
+            ip_info = self.get_ip_address_by_address(hostname_or_ip)
+            if ip_info:
+                return self._ip_result(ip_info, self.get_device_by_id)
+
+        # Host names, and IPs unknown to IPAM (a host may be named after its address)
+        return self.search_host(hostname_or_ip)
+
+    def enrich_hosts_bulk(self, values):
+        """
+        Enrich many hostnames or IPs with one list query per endpoint
+
+        Equivalent to calling enrich_host_data for each value, but NetBox is
+        queried with repeated name/address/id filters instead of per value.
+
+        Args:
+            values (list): Hostnames or IP addresses
 
-            # Try to get associated device or VM
-            assigned_object = ip_info.get('assigned_object')
-            if assigned_object:
-                assigned_object_type = assigned_object.get('object_type')
-                if assigned_object_type == 'dcim.interface':
-                    # Get device from interface
+        Returns:
+            dict: Enriched host data per value found in NetBox
+        """
+        results = {}
+        addresses = [value for value in values if _is_ip(value)]
+
+        # IP addresses match on the host part, whatever the prefix length
+        if addresses:
+            ip_infos = {}
+            for ip_info in self._iter_filtered('ipam/ip-addresses/', 'address', addresses):
+                ip_infos.setdefault(_host_part(ip_info.get('address', '')), ip_info)
+
+            # Fetch devices behind interface assignments in one query
+            device_ids = set()
+            for ip_info in ip_infos.values():
+                assigned_object = ip_info.get('assigned_object')
+                if assigned_object and assigned_object.get('object_type') == 'dcim.interface':
                     device_info = assigned_object.get('device')
                     if device_info and device_info.get('id'):
-                        device = self.get_device_by_id(device_info['id'])
-                        result['associated_device'] = device
-                elif assigned_object_type == 'virtualization.vminterface':
-                    # Get VM from interface
-                    vm_info = assigned_object.get('virtual_machine')
-                    if vm_info:
-                        result['associated_vm'] = vm_info
+                        device_ids.add(device_info['id'])
+            devices = {}
+            if device_ids:
+                devices = {
+                    device.get('id'): device
+                    for device in self._iter_filtered('dcim/devices/', 'id', sorted(device_ids))
+                }
+
+            for address in addresses:
+                ip_info = ip_infos.get(_host_part(address))
+                if ip_info:
+                    results[address] = self._ip_result(ip_info, devices.get)
+
+        # Hosts: host names plus IPs unknown to IPAM, devices first, then VMs
+        # for names not found as devices
+        hostnames = [value for value in values if value not in results]
+        if hostnames:
+            devices = self._iter_filtered('dcim/devices/', 'name', hostnames)
+            for name, device in _match_names(devices, hostnames).items():
+                results[name] = {'type': 'device', 'data': device}
+
+            remaining = [name for name in hostnames if name not in results]
+            if remaining:
+                vms = self._iter_filtered('virtualization/virtual-machines/', 'name', remaining)
+                for name, vm in _match_names(vms, remaining).items():
+                    results[name] = {'type': 'virtual_machine', 'data': vm}
+
+        return {value: results[value] for value in values if value in results}
+
+    def _ip_result(self, ip_info, get_device):
+        """
+        Build enriched data for an IP address object
 
-            return result
+        Args:
+            ip_info (dict): IP address object
+            get_device (callable): Returns the device object for a device ID
+
+        Returns:
+            dict: Enriched IP address data
+        """
+        result = {
+            'type': 'ip_address',
+            'data': ip_info
+        }
+
+        # Try to get associated device or VM
+        assigned_object = ip_info.get('assigned_object')
+        if assigned_object:
+            assigned_object_type = assigned_object.get('object_type')
+            if assigned_object_type == 'dcim.interface':
+                # Get device from interface
+                device_info = assigned_object.get('device')
+                if device_info and device_info.get('id'):
+                    result['associated_device'] = get_device(device_info['id'])
+            elif assigned_object_type == 'virtualization.vminterface':
+                # Get VM from interface
+                vm_info = assigned_object.get('virtual_machine')
+                if vm_info:
+                    result['associated_vm'] = vm_info
+
+        return result
 
-        return None
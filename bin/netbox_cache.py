@@ -0,0 +1,104 @@
+# encoding = utf-8
+
+"""
+NetBox Enrichment Cache Module
+Persists enrich_host_data results across search invocations in SQLite
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from netbox_utils import json_dumps as _dumps, json_loads as _loads
+
+
+class NetBoxCache:
+    """
+    Time-limited cache of enrichment results keyed by NetBox URL, API token
+    and lookup value
+    """
+
+    def __init__(self, path, url, token, ttl=900):
+        """
+        Open (or create) cache database
+
+        Args:
+            path (str): Path to SQLite cache database
+            url (str): NetBox instance URL the cached results belong to
+            token (str): API token the results were fetched with
+            ttl (int): Seconds a cached result stays valid
+        """
+        self.url = url
+        # Results are only served back to the token that could see them; a
+        # digest keeps the token itself out of the database
+        self.token = hashlib.sha256((token or '').encode('utf-8')).hexdigest()
+        self.ttl = ttl
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+        # Layouts before user_version 1 were not scoped by token
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            self._conn.execute("DROP TABLE IF EXISTS cache")
+            self._conn.execute("PRAGMA user_version = 1")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache("
+            "url TEXT, token TEXT, key TEXT, value BLOB, expires REAL, PRIMARY KEY(url, token, key))"
+        )
+
+        # Drop expired entries so the database does not grow unbounded
+        self._conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def get_many(self, keys, chunk_size=500):
+        """
+        Get cached results for lookup values
+
+        Args:
+            keys (list): Lookup values
+            chunk_size (int): Maximum number of values per query
+
+        Returns:
+            dict: Cached result (possibly None for a cached miss) per found key
+        """
+        keys = list(keys)
+        found = {}
+        now = time.time()
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i:i + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, value FROM cache WHERE url = ? AND token = ? AND expires > ? AND key IN ({placeholders})",
+                (self.url, self.token, now, *chunk)
+            )
+            found.update((key, _loads(value)) for key, value in rows)
+        return found
+
+    def set_many(self, results):
+        """
+        Store results for lookup values
+
+        Args:
+            results (dict): Result (or None for a miss) per lookup value
+        """
+        expires = time.time() + self.ttl
+        # Commit, or roll back so a failed write leaves no open transaction
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                [(self.url, self.token, key, _dumps(value), expires) for key, value in results.items()]
+            )
+
+    def close(self):
+        """
+        Close the database
+        """
+        self._conn.close()
@@ -8,7 +8,8 @@ Main entry point for the modular input
 
 import os
 import sys
-import json
+import io
+import threading
 
 # Add bin directory to path
 bin_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,7 +18,6 @@ if bin_dir not in sys.path:
 
 try:
     from splunklib import modularinput as smi
-    import input_module_netbox as input_module
 except ImportError as e:
     print(f"Import error: {str(e)}")
     sys.exit(1)
@@ -28,7 +28,22 @@ class ModInputNetBox(smi.Script):
     NetBox Modular Input class
     """
 
+    _scheme = None
+
     def get_scheme(self):
+        """
+        Get the input scheme, building it on first use
+
+        Returns:
+            Scheme: Modular input scheme
+        """
+        cls = type(self)
+        if cls._scheme is None:
+            cls._scheme = cls._build_scheme()
+        return cls._scheme
+
+    @classmethod
+    def _build_scheme(cls):
         """
         Define the input scheme with all parameters
 
@@ -122,6 +137,9 @@ class ModInputNetBox(smi.Script):
         Raises:
             Exception: If validation fails
         """
+        # Deferred so scheme introspection doesn't load the NetBox client
+        import input_module_netbox as input_module
+
         try:
             input_module.validate_input(self, validation_definition)
         except Exception as e:
@@ -135,14 +153,18 @@ class ModInputNetBox(smi.Script):
             inputs: Input definitions
             ew: Event writer
         """
+        import input_module_netbox as input_module
+
         # Get input configuration
         for input_name, input_item in inputs.inputs.items():
             try:
                 # Create a helper-like object with input parameters
                 helper = InputHelper(input_item, self.service, ew)
 
-                # Collect events
+                # Collect events; on failure the collector has already dropped
+                # events that were buffered but not checkpointed
                 input_module.collect_events(helper, ew)
+                helper.flush()
 
             except Exception as e:
                 ew.log(smi.EventWriter.ERROR, f"Error collecting events for input {input_name}: {str(e)}")
@@ -153,6 +175,8 @@ class InputHelper:
     Helper class to provide Splunk modular input helper interface
     """
 
+    __slots__ = ('input_item', 'service', 'ew', '_local')
+
     def __init__(self, input_item, service, ew):
         """
         Initialize helper
@@ -165,6 +189,21 @@ class InputHelper:
         self.input_item = input_item
         self.service = service
         self.ew = ew
+        # Buffers are per thread, so concurrent collectors only ever write
+        # out (or drop) their own events
+        self._local = threading.local()
+
+    def _events(self):
+        """
+        Get the calling thread's event buffer
+
+        Returns:
+            list: Buffered events
+        """
+        events = getattr(self._local, 'events', None)
+        if events is None:
+            events = self._local.events = []
+        return events
 
     def get_arg(self, arg_name):
         """
@@ -248,6 +287,44 @@ class InputHelper:
 
         return event
 
+    def write_event(self, event):
+        """
+        Buffer event for writing to Splunk on the next flush
+
+        Args:
+            event: Event object
+        """
+        self._events().append(event)
+
+    def flush(self):
+        """
+        Write the calling thread's buffered events to Splunk in a single write
+        """
+        events = self._events()
+        if not events:
+            return
+
+        # Serialize into memory first; Event.write_to flushes its stream after
+        # every event, which is a no-op for StringIO
+        buffer = io.StringIO()
+        for event in events:
+            event.write_to(buffer)
+        self._local.events = []
+
+        # Writes through EventWriter internals (_out, header_written) as found
+        # in splunklib 1.6 through 2.x; recheck when upgrading splunklib
+        if not self.ew.header_written:
+            self.ew._out.write("<stream>")
+            self.ew.header_written = True
+        self.ew._out.write(buffer.getvalue())
+        self.ew._out.flush()
+
+    def discard(self):
+        """
+        Drop the calling thread's buffered events without writing them
+        """
+        self._local.events = []
+
 
 if __name__ == "__main__":
     exitcode = ModInputNetBox().run(sys.argv)
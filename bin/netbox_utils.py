@@ -0,0 +1,61 @@
+# encoding = utf-8
+
+"""
+NetBox Connector Utilities Module
+Helpers shared by the modular input and the enrichment search command
+"""
+
+import itertools
+import json
+
+# Prefer the C-accelerated orjson codec when it is available. Both paths
+# emit compact UTF-8 JSON and stringify values JSON cannot represent natively.
+try:
+    import orjson
+
+    def json_dumps(obj):
+        """
+        Serialize an object to a JSON string
+
+        Args:
+            obj: Object to serialize
+
+        Returns:
+            str: Compact JSON
+        """
+        return orjson.dumps(obj, default=str).decode('utf-8')
+
+    json_loads = orjson.loads
+except ImportError:
+    def json_dumps(obj):
+        """
+        Serialize an object to a JSON string
+
+        Args:
+            obj: Object to serialize
+
+        Returns:
+            str: Compact JSON
+        """
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=str)
+
+    json_loads = json.loads
+
+
+def batched(iterable, size):
+    """
+    Split an iterable into lists of at most size items
+
+    Args:
+        iterable: Items to split
+        size: Maximum batch size
+
+    Yields:
+        list: Consecutive batches of items
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -8,7 +8,9 @@ Enriches Splunk events with data from NetBox
 
 import sys
 import os
-import json
+import types
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # Add bin directory to path
 bin_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,12 +19,170 @@ if bin_dir not in sys.path:
 
 try:
     from splunklib.searchcommands import dispatch, StreamingCommand, Configuration, Option, validators
-    import netbox_api
+    from netbox_utils import batched, json_dumps as _dumps
 except ImportError as e:
     print(f"Import error: {str(e)}")
     sys.exit(1)
 
 
+# Shared stand-in for missing or null nested objects, never mutated
+_EMPTY = {}
+
+# Names of enriched fields, prefixed once per search in stream()
+ENRICHED_FIELDS = (
+    'found', 'type', 'id', 'name', 'device_type', 'device_role', 'site', 'rack', 'status',
+    'primary_ip', 'serial', 'asset_tag', 'cluster', 'role', 'vcpus', 'memory', 'disk', 'address',
+    'dns_name', 'associated_type', 'associated_name', 'associated_site', 'tags', 'error',
+)
+
+# Enrichment results shared across searches
+CACHE_PATH = os.path.join(os.path.dirname(bin_dir), 'local', 'netbox_cache.db')
+
+# Records buffered per batch, values per bulk NetBox query and concurrent
+# bulk queries per batch
+BATCH_SIZE = 256
+BULK_SIZE = 100
+LOOKUP_WORKERS = 16
+
+# Most recently used lookup results kept in memory per search
+MEMO_SIZE = 4096
+
+
+def _format_cf(value):
+    """
+    Format a custom field value for a Splunk field
+
+    Args:
+        value: Custom field value from NetBox
+
+    Returns:
+        str: Empty for unset values, JSON for objects and lists, text otherwise
+    """
+    if value is None or value == '':
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return _dumps(value)
+    return str(value)
+
+
+def _extract_device(record, data, enriched_data, K):
+    """
+    Populate device-specific enriched fields
+
+    Args:
+        record: Event record to update
+        data: NetBox device object
+        enriched_data: Full enrich_host_data result
+        K: Prefixed field names
+    """
+    record[K.device_type] = (data.get('device_type') or _EMPTY).get('display', '')
+    record[K.device_role] = (data.get('device_role') or _EMPTY).get('name', '')
+    record[K.site] = (data.get('site') or _EMPTY).get('name', '')
+    record[K.rack] = (data.get('rack') or _EMPTY).get('name', '')
+    record[K.status] = (data.get('status') or _EMPTY).get('value', '')
+    record[K.primary_ip] = (data.get('primary_ip') or _EMPTY).get('address', '')
+    record[K.serial] = data.get('serial', '')
+    record[K.asset_tag] = data.get('asset_tag', '')
+
+
+def _extract_vm(record, data, enriched_data, K):
+    """
+    Populate virtual machine-specific enriched fields
+
+    Args:
+        record: Event record to update
+        data: NetBox virtual machine object
+        enriched_data: Full enrich_host_data result
+        K: Prefixed field names
+    """
+    record[K.status] = (data.get('status') or _EMPTY).get('value', '')
+    record[K.site] = (data.get('site') or _EMPTY).get('name', '')
+    record[K.cluster] = (data.get('cluster') or _EMPTY).get('name', '')
+    record[K.role] = (data.get('role') or _EMPTY).get('name', '')
+    record[K.primary_ip] = (data.get('primary_ip') or _EMPTY).get('address', '')
+    record[K.vcpus] = data.get('vcpus', '')
+    record[K.memory] = data.get('memory', '')
+    record[K.disk] = data.get('disk', '')
+
+
+def _extract_ip(record, data, enriched_data, K):
+    """
+    Populate IP address-specific enriched fields
+
+    Args:
+        record: Event record to update
+        data: NetBox IP address object
+        enriched_data: Full enrich_host_data result
+        K: Prefixed field names
+    """
+    record[K.address] = data.get('address', '')
+    record[K.status] = (data.get('status') or _EMPTY).get('value', '')
+    record[K.dns_name] = data.get('dns_name', '')
+
+    # Add associated device or VM info
+    if 'associated_device' in enriched_data:
+        assoc_dev = enriched_data['associated_device']
+        record[K.associated_type] = 'device'
+        record[K.associated_name] = assoc_dev.get('name', '')
+        record[K.associated_site] = (assoc_dev.get('site') or _EMPTY).get('name', '')
+    elif 'associated_vm' in enriched_data:
+        assoc_vm = enriched_data['associated_vm']
+        record[K.associated_type] = 'virtual_machine'
+        record[K.associated_name] = assoc_vm.get('name', '')
+
+
+def _extract_noop(record, data, enriched_data, K):
+    """
+    Leave record unchanged for unknown object types
+    """
+
+
+# Type-specific field extractors keyed by enrich_host_data result type
+EXTRACTORS = {
+    'device': _extract_device,
+    'virtual_machine': _extract_vm,
+    'ip_address': _extract_ip,
+}
+
+
+def _apply_enrichment(record, enriched_data, K, cf_prefix):
+    """
+    Add enriched fields for one NetBox result to a record
+
+    Args:
+        record: Event record to update
+        enriched_data: enrich_host_data result
+        K: Prefixed field names
+        cf_prefix: Prefix for custom field names
+    """
+    record[K.found] = True
+    record[K.type] = enriched_data.get('type', '')
+
+    # Flatten and add data
+    data = enriched_data.get('data', {})
+    if not data:
+        return
+
+    # Add main fields
+    record[K.id] = data.get('id', '')
+    record[K.name] = data.get('name', '')
+
+    # Type-specific fields
+    EXTRACTORS.get(enriched_data['type'], _extract_noop)(record, data, enriched_data, K)
+
+    # Add tags if present, as a multivalue field
+    if 'tags' in data:
+        record[K.tags] = [tag.get('name', '') for tag in data.get('tags') or []]
+
+    # Add custom fields if present
+    if 'custom_fields' in data:
+        custom_fields = data.get('custom_fields') or _EMPTY
+        for cf_key, cf_value in custom_fields.items():
+            record[cf_prefix + cf_key] = _format_cf(cf_value)
+
+
 @Configuration()
 class NetBoxEnrichCommand(StreamingCommand):
     """
@@ -85,6 +245,17 @@ class NetBoxEnrichCommand(StreamingCommand):
         default='netbox_'
     )
 
+    cache_ttl = Option(
+        doc='''
+        **Syntax:** **cache_ttl=***<seconds>*
+        **Description:** Seconds to reuse NetBox results across searches (0 disables the cache)
+        **Default:** 900
+        ''',
+        require=False,
+        default=900,
+        validate=validators.Integer(0)
+    )
+
     def stream(self, records):
         """
         Process and enrich records
@@ -95,103 +266,133 @@ class NetBoxEnrichCommand(StreamingCommand):
         Yields:
             Enriched event records
         """
+        # Deferred so the separate __GETINFO__ process of the legacy search
+        # protocol does not load requests, urllib3 or sqlite3
+        import sqlite3
+        import netbox_api
+        import netbox_cache
+
+        cache = None
+
         try:
             # Initialize NetBox API client
             client = netbox_api.NetBoxAPIClient(
                 url=self.netbox_url,
                 token=self.netbox_token,
-                verify_ssl=self.verify_ssl
+                verify_ssl=self.verify_ssl,
+                max_workers=LOOKUP_WORKERS
             )
 
-            # Process each record
-            for record in records:
-                try:
-                    # Get the value to lookup
-                    lookup_value = record.get(self.field)
+            # Precompute prefixed field names once instead of per record
+            K = types.SimpleNamespace(**{name: self.prefix + name for name in ENRICHED_FIELDS})
+            cf_prefix = self.prefix + 'cf_'
 
-                    if not lookup_value:
-                        self.logger.warning(f"Field '{self.field}' not found in record")
-                        yield record
-                        continue
-
-                    # Enrich data from NetBox
-                    enriched_data = client.enrich_host_data(str(lookup_value))
-
-                    if enriched_data:
-                        # Add enriched fields to record
-                        record[f'{self.prefix}found'] = True
-                        record[f'{self.prefix}type'] = enriched_data.get('type', '')
-
-                        # Flatten and add data
-                        data = enriched_data.get('data', {})
-                        if data:
-                            # Add main fields
-                            record[f'{self.prefix}id'] = data.get('id', '')
-                            record[f'{self.prefix}name'] = data.get('name', '')
-
-                            if enriched_data['type'] == 'device':
-                                # Device-specific fields
-                                record[f'{self.prefix}device_type'] = data.get('device_type', {}).get('display', '') if data.get('device_type') else ''
-                                record[f'{self.prefix}device_role'] = data.get('device_role', {}).get('name', '') if data.get('device_role') else ''
-                                record[f'{self.prefix}site'] = data.get('site', {}).get('name', '') if data.get('site') else ''
-                                record[f'{self.prefix}rack'] = data.get('rack', {}).get('name', '') if data.get('rack') else ''
-                                record[f'{self.prefix}status'] = data.get('status', {}).get('value', '') if data.get('status') else ''
-                                record[f'{self.prefix}primary_ip'] = data.get('primary_ip', {}).get('address', '') if data.get('primary_ip') else ''
-                                record[f'{self.prefix}serial'] = data.get('serial', '')
-                                record[f'{self.prefix}asset_tag'] = data.get('asset_tag', '')
-
-                            elif enriched_data['type'] == 'virtual_machine':
-                                # VM-specific fields
-                                record[f'{self.prefix}status'] = data.get('status', {}).get('value', '') if data.get('status') else ''
-                                record[f'{self.prefix}site'] = data.get('site', {}).get('name', '') if data.get('site') else ''
-                                record[f'{self.prefix}cluster'] = data.get('cluster', {}).get('name', '') if data.get('cluster') else ''
-                                record[f'{self.prefix}role'] = data.get('role', {}).get('name', '') if data.get('role') else ''
-                                record[f'{self.prefix}primary_ip'] = data.get('primary_ip', {}).get('address', '') if data.get('primary_ip') else ''
-                                record[f'{self.prefix}vcpus'] = data.get('vcpus', '')
-                                record[f'{self.prefix}memory'] = data.get('memory', '')
-                                record[f'{self.prefix}disk'] = data.get('disk', '')
-
-                            elif enriched_data['type'] == 'ip_address':
-                                # IP-specific fields
-                                record[f'{self.prefix}address'] = data.get('address', '')
-                                record[f'{self.prefix}status'] = data.get('status', {}).get('value', '') if data.get('status') else ''
-                                record[f'{self.prefix}dns_name'] = data.get('dns_name', '')
-
-                                # Add associated device or VM info
-                                if 'associated_device' in enriched_data:
-                                    assoc_dev = enriched_data['associated_device']
-                                    record[f'{self.prefix}associated_type'] = 'device'
-                                    record[f'{self.prefix}associated_name'] = assoc_dev.get('name', '')
-                                    record[f'{self.prefix}associated_site'] = assoc_dev.get('site', {}).get('name', '') if assoc_dev.get('site') else ''
-                                elif 'associated_vm' in enriched_data:
-                                    assoc_vm = enriched_data['associated_vm']
-                                    record[f'{self.prefix}associated_type'] = 'virtual_machine'
-                                    record[f'{self.prefix}associated_name'] = assoc_vm.get('name', '')
-
-                            # Add tags if present
-                            if 'tags' in data:
-                                tags = [tag.get('name', '') for tag in data.get('tags', [])]
-                                record[f'{self.prefix}tags'] = json.dumps(tags)
-
-                            # Add custom fields if present
-                            if 'custom_fields' in data:
-                                custom_fields = data.get('custom_fields', {})
-                                for cf_key, cf_value in custom_fields.items():
-                                    record[f'{self.prefix}cf_{cf_key}'] = str(cf_value) if cf_value else ''
-                    else:
-                        record[f'{self.prefix}found'] = False
-                        self.logger.debug(f"No NetBox data found for: {lookup_value}")
+            # Results already resolved in this search, repeated hosts (and
+            # misses) then cost a single NetBox round-trip; least recently
+            # used entries are evicted past MEMO_SIZE
+            memo = OrderedDict()
+
+            # Bind attributes used in the record loop to locals
+            field = self.field
+            log_warn = self.logger.warning
+            log_err = self.logger.error
+            log_dbg = self.logger.debug
+            apply_enrichment = _apply_enrichment
 
+            def fetch(chunk):
+                try:
+                    found = client.enrich_hosts_bulk(chunk)
+                    return {value: (found.get(value), None) for value in chunk}
                 except Exception as e:
-                    self.logger.error(f"Error enriching record: {str(e)}")
-                    record[f'{self.prefix}error'] = str(e)
+                    log_warn(f"Bulk NetBox lookup of {len(chunk)} values failed, retrying per value: {str(e)}")
+
+                # Retry a failed chunk per value so one bad value only marks
+                # its own records
+                results = {}
+                for value in chunk:
+                    try:
+                        results[value] = (client.enrich_host_data(value), None)
+                    except Exception as e:
+                        results[value] = (None, e)
+                return results
+
+            # Results persisted by earlier searches
+            if self.cache_ttl:
+                try:
+                    cache = netbox_cache.NetBoxCache(CACHE_PATH, self.netbox_url, self.netbox_token, ttl=self.cache_ttl)
+                except (sqlite3.Error, OSError) as e:
+                    log_warn(f"NetBox cache unavailable, continuing without it: {str(e)}")
+
+            with ThreadPoolExecutor(max_workers=LOOKUP_WORKERS) as executor:
+                for batch in batched(records, BATCH_SIZE):
+                    values = {str(record.get(field)) for record in batch if record.get(field)}
+                    resolved = {}
+                    for value in values:
+                        if value in memo:
+                            memo.move_to_end(value)
+                            resolved[value] = (memo[value], None)
+                    if cache:
+                        pending = [value for value in values if value not in resolved]
+                        try:
+                            resolved.update((value, (data, None)) for value, data in cache.get_many(pending).items())
+                        except (sqlite3.Error, OSError) as e:
+                            # e.g. locked by a concurrent search, skip it for this batch
+                            log_warn(f"NetBox cache read failed, continuing without it: {str(e)}")
+
+                    # Resolve the remaining values with bulk list queries, the
+                    # chunks run concurrently so their round-trips overlap
+                    misses = [value for value in values if value not in resolved]
+                    chunks = [misses[i:i + BULK_SIZE] for i in range(0, len(misses), BULK_SIZE)]
+                    fetched = {}
+                    for part in executor.map(fetch, chunks):
+                        fetched.update(part)
+                    resolved.update(fetched)
+
+                    if cache:
+                        try:
+                            cache.set_many({value: data for value, (data, error) in fetched.items() if error is None})
+                        except (sqlite3.Error, OSError) as e:
+                            log_warn(f"NetBox cache write failed, continuing without it: {str(e)}")
+                    memo.update((value, data) for value, (data, error) in resolved.items() if error is None)
+                    while len(memo) > MEMO_SIZE:
+                        memo.popitem(last=False)
+
+                    # Process each record
+                    for record in batch:
+                        try:
+                            # Get the value to lookup
+                            lookup_value = record.get(field)
+
+                            if not lookup_value:
+                                log_warn(f"Field '{field}' not found in record")
+                                yield record
+                                continue
+
+                            # Enrich data from NetBox
+                            enriched_data, error = resolved[str(lookup_value)]
+                            if error:
+                                raise error
+
+                            if enriched_data:
+                                apply_enrichment(record, enriched_data, K, cf_prefix)
+                            else:
+                                record[K.found] = False
+                                log_dbg(f"No NetBox data found for: {lookup_value}")
+
+                        except Exception as e:
+                            log_err(f"Error enriching record: {str(e)}")
+                            record[K.error] = str(e)
 
-                yield record
+                        yield record
 
         except Exception as e:
             self.logger.error(f"Fatal error in NetBox enrichment: {str(e)}")
             raise
 
+        finally:
+            if cache:
+                cache.close()
+
 
 if __name__ == "__main__":
     dispatch(NetBoxEnrichCommand, sys.argv, sys.stdin, sys.stdout, __name__)